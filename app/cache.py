@@ -0,0 +1,96 @@
+"""
+In-memory TTL cache for upstream API calls.
+Entries are served while fresh and kept around as a stale fallback for when
+the Google Ads or Merchant Center APIs fail.
+"""
+import functools
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+# key -> (timestamp, stale_at, value)
+_store: Dict[Tuple, Tuple[float, float, Any]] = {}
+_lock = threading.Lock()
+
+# Expired entries are swept out on write, at most once per interval, so the
+# store doesn't grow with every customer and date range ever requested
+PRUNE_INTERVAL_S = 60
+_next_prune = 0.0
+
+
+def _make_key(func: Callable, args: tuple, kwargs: dict) -> Tuple:
+    return (func.__module__, func.__qualname__, args, tuple(sorted(kwargs.items())))
+
+
+def _put_locked(key: Tuple, now: float, stale_at: float, value: Any) -> None:
+    """Store an entry, sweeping expired ones if due. Caller must hold _lock."""
+    global _next_prune
+    if now >= _next_prune:
+        for expired_key in [k for k, entry in _store.items() if now >= entry[1]]:
+            del _store[expired_key]
+        _next_prune = now + PRUNE_INTERVAL_S
+    _store[key] = (now, stale_at, value)
+
+
+def ttl_cached(fresh_s: float, stale_s: float) -> Callable:
+    """
+    Cache a function's results keyed by its qualified name and arguments.
+
+    Args:
+        fresh_s: Seconds a result is served without calling the function again
+        stale_s: Seconds a result is kept for `stale()` lookups after an upstream failure
+
+    The wrapped function gains a `stale(*args, **kwargs)` method returning the
+    last cached result (fresh or stale), or None if nothing usable is cached.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = _make_key(func, args, kwargs)
+            now = time.monotonic()
+            with _lock:
+                entry = _store.get(key)
+            if entry is not None and now - entry[0] < fresh_s:
+                return entry[2]
+
+            value = func(*args, **kwargs)
+            now = time.monotonic()
+            with _lock:
+                _put_locked(key, now, now + stale_s, value)
+            return value
+
+        def stale(*args, **kwargs) -> Optional[Any]:
+            key = _make_key(func, args, kwargs)
+            with _lock:
+                entry = _store.get(key)
+            if entry is None or time.monotonic() >= entry[1]:
+                return None
+            return entry[2]
+
+        wrapper.stale = stale
+        return wrapper
+
+    return decorator
+
+
+def cache_put(key: Tuple, value: Any, ttl_s: float) -> None:
+    """Store a value directly under `key` for `ttl_s` seconds."""
+    now = time.monotonic()
+    with _lock:
+        _put_locked(key, now, now + ttl_s, value)
+
+
+def cache_get(key: Tuple) -> Optional[Any]:
+    """Return the value stored with `cache_put`, or None if missing or expired."""
+    with _lock:
+        entry = _store.get(key)
+    if entry is None or time.monotonic() >= entry[1]:
+        return None
+    return entry[2]
+
+
+def clear_cache() -> None:
+    """Drop every cached entry."""
+    with _lock:
+        _store.clear()
@@ -0,0 +1,55 @@
+"""
+Request coalescing for upstream API calls.
+Concurrent calls with the same arguments share one in-flight request instead
+of each hitting the API.
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """
+    De-duplicate concurrent calls to a blocking fetcher.
+
+    The first caller for a set of arguments starts the fetch in a worker thread
+    right away; callers arriving while it is in flight await the same result.
+    In-flight state lives in a thread-safe Future rather than on any event
+    loop, so it is shared across loops and cleared when the fetch finishes,
+    even if the loop that started it has since closed.
+
+    Args:
+        func: Blocking function to call, e.g. a ttl_cached API fetcher
+    """
+
+    def __init__(self, func: Callable[..., Any]):
+        self._func = func
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Tuple, Future] = {}
+
+    async def get(self, *args: Hashable, **kwargs: Hashable) -> Any:
+        """Return func(*args, **kwargs), joining an identical in-flight call if any."""
+        key = (args, tuple(sorted(kwargs.items())))
+        with self._lock:
+            future = self._in_flight.get(key)
+            start = future is None
+            if start:
+                future = self._in_flight[key] = Future()
+        if start:
+            loop = asyncio.get_running_loop()
+            loop.run_in_executor(None, self._run, key, future, args, kwargs)
+        # Shield so one cancelled caller doesn't cancel the result for the others
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+    def _run(self, key: Tuple, future: Future, args: tuple, kwargs: dict) -> None:
+        try:
+            result = self._func(*args, **kwargs)
+        except BaseException as e:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            future.set_exception(e)
+        else:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            future.set_result(result)
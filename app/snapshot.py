@@ -2,11 +2,21 @@
 Snapshot builder - core logic to assemble performance snapshots.
 Combines data from Google Ads and Merchant Center APIs.
 """
-from typing import List, Optional
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+import asyncio
+import functools
+import heapq
+import logging
 import random
+import sys
 from datetime import datetime, timedelta
+from itertools import islice
+
+from google.ads.googleads.errors import GoogleAdsException
 
 from config import settings
+from app.cache import cache_get, cache_put, ttl_cached
+from app.coalesce import SingleFlight
 from app.models import (
     Summary, Issue, RecommendedAction, SnapshotResponse,
     CampaignKPI, SearchTermData, DisapprovedProduct
@@ -19,8 +29,85 @@ from app.google_ads import (
 )
 from app.merchant_center import mc_get_disapproved_products, mc_check_feed_health
 
+logger = logging.getLogger(__name__)
+
+
+# Cached upstream fetchers. KPIs move quickly; policy and feed status change
+# on the order of hours, so they are kept fresh for longer.
+cached_account_kpis = ttl_cached(fresh_s=60, stale_s=600)(ads_get_account_kpis)
+cached_campaign_kpis = ttl_cached(fresh_s=60, stale_s=600)(ads_get_campaign_kpis)
+cached_search_terms = ttl_cached(fresh_s=300, stale_s=1800)(ads_get_search_terms)
+cached_policy_issues = ttl_cached(fresh_s=600, stale_s=3600)(ads_get_policy_issues)
+cached_disapproved_products = ttl_cached(fresh_s=600, stale_s=3600)(mc_get_disapproved_products)
+
+# Concurrent snapshots for the same customer and date range share one
+# in-flight request per endpoint
+account_kpis_flight = SingleFlight(cached_account_kpis)
+campaign_kpis_flight = SingleFlight(cached_campaign_kpis)
+search_terms_flight = SingleFlight(cached_search_terms)
+policy_issues_flight = SingleFlight(cached_policy_issues)
+disapproved_products_flight = SingleFlight(cached_disapproved_products)
+
+# Search terms below this spend are not fetched. The same value must be used
+# for the fetch and the stale lookup, since it is part of the cache key
+SEARCH_TERM_MIN_SPEND = 10.0
+
+# While set, Google Ads reported exhausted quota and snapshots are served from
+# cache or demo data instead of hitting the API again
+QUOTA_CIRCUIT_KEY = ("google_ads_quota_exhausted",)
+QUOTA_BACKOFF_S = 60
+
+
+class IssueRecord(NamedTuple):
+    """Issue produced by an analyzer, converted to an Issue model after sorting."""
+    type: str
+    severity: str
+    description: str
+    metadata: dict
+
+
+class ActionRecord(NamedTuple):
+    """Recommendation produced by an analyzer, converted to a RecommendedAction after sorting."""
+    action_type: str
+    description: str
+    priority: str
+    related_issue_type: Optional[str]
 
-def build_snapshot(customer_id: str, date_range: str = "7d") -> SnapshotResponse:
+
+# Issue and action type tags, interned so every record shares one string object
+ISSUE_DISAPPROVED_PRODUCT = sys.intern("disapproved_product")
+ISSUE_ZERO_CONVERSION_CAMPAIGN = sys.intern("zero_conversion_campaign")
+ISSUE_HIGH_CPA_CAMPAIGN = sys.intern("high_cpa_campaign")
+ISSUE_WASTEFUL_SEARCH_TERM = sys.intern("wasteful_search_term")
+ISSUE_LOW_CONVERSION_SEARCH_TERM = sys.intern("low_conversion_search_term")
+ISSUE_POLICY_LIMITED_AD = sys.intern("policy_limited_ad")
+ACTION_FIX_PRODUCT_FEED = sys.intern("fix_product_feed")
+ACTION_OPTIMIZE_CAMPAIGN = sys.intern("optimize_campaign")
+ACTION_ADD_NEGATIVE_KEYWORD = sys.intern("add_negative_keyword")
+ACTION_REVIEW_SEARCH_TERM = sys.intern("review_search_term")
+ACTION_FIX_POLICY_ISSUE = sys.intern("fix_policy_issue")
+
+# Sort rank shared by issue severity and action priority; unknown values rank last (3)
+_RANK = {"high": 0, "medium": 1, "low": 2}
+_RANK_GET = _RANK.get
+
+# Description templates, formatted with % in the analyzer loops
+PRODUCT_DESC = "Product '%s' (ID: %s) is disapproved"
+PRODUCT_ISSUE_DESC = "Product '%s' (ID: %s) is disapproved: %s"
+PRODUCT_REC_DESC = "Fix product data for '%s' and request a review in Merchant Center"
+ZERO_CONV_DESC = "Campaign '%s' spent $%.2f with 0 conversions"
+ZERO_CONV_REC_DESC = "Review and optimize campaign '%s' or pause it to prevent budget waste"
+HIGH_CPA_DESC = "Campaign '%s' has CPA of $%.2f, 2x higher than account average"
+HIGH_CPA_REC_DESC = "Optimize targeting or ad copy for campaign '%s' to reduce CPA"
+WASTEFUL_TERM_DESC = "Search term '%s' spent $%.2f with 0 conversions"
+WASTEFUL_TERM_REC_DESC = "Add '%s' as a negative keyword to prevent budget waste"
+LOW_CONV_TERM_DESC = "Search term '%s' has low conversion rate (%.2f%%) with $%.2f spend"
+LOW_CONV_TERM_REC_DESC = "Review search term '%s' and consider adding as negative or adjusting match type"
+POLICY_DESC = "Ad '%(ad_name)s' in campaign '%(campaign_name)s' has approval status: %(approval_status)s"
+POLICY_REC_DESC = "Review and modify ad '%(ad_name)s' to comply with Google Ads policies"
+
+
+async def build_snapshot(customer_id: str, date_range: str = "7d") -> SnapshotResponse:
     """
     Build a complete performance snapshot for the given customer and date range.
     
@@ -35,75 +122,175 @@ def build_snapshot(customer_id: str, date_range: str = "7d") -> SnapshotResponse
     if not settings.google_ads_developer_token:
         return build_demo_snapshot(customer_id, date_range)
 
+    # Don't add to a thundering herd while Google Ads is rejecting us for quota
+    if cache_get(QUOTA_CIRCUIT_KEY):
+        logger.info("Google Ads quota backoff active; skipping API calls")
+        return build_fallback_snapshot(customer_id, date_range)
+
     try:
-        # Fetch data from Google Ads
-        account_kpis = ads_get_account_kpis(customer_id, date_range)
-        campaign_kpis = ads_get_campaign_kpis(customer_id, date_range)
-        search_terms = ads_get_search_terms(customer_id, date_range, min_spend=10.0)
-        policy_issues = ads_get_policy_issues(customer_id)
-        
-        # Fetch data from Merchant Center
-        disapproved_products = mc_get_disapproved_products()
-        
-        # Build summary
-        summary = Summary(
-            date_range=date_range,
-            total_spend=account_kpis["total_spend"],
-            total_conversions=account_kpis["total_conversions"],
-            average_cpa=account_kpis["average_cpa"],
-            roas=account_kpis["roas"],
-            currency=account_kpis["currency"]
+        # Fetch data from Google Ads and Merchant Center concurrently.
+        # The client libraries are blocking, so each call runs in a worker
+        # thread and the event loop stays free while waiting on the network.
+        (
+            account_kpis,
+            campaign_kpis,
+            search_terms,
+            policy_issues,
+            disapproved_products
+        ) = await asyncio.gather(
+            account_kpis_flight.get(customer_id, date_range),
+            campaign_kpis_flight.get(customer_id, date_range),
+            search_terms_flight.get(customer_id, date_range, min_spend=SEARCH_TERM_MIN_SPEND),
+            policy_issues_flight.get(customer_id),
+            disapproved_products_flight.get()
         )
-        
-        # Identify issues and generate recommendations
-        issues = []
-        recommendations = []
-        
-        # 1. Check for disapproved products
-        issues_from_products, recs_from_products = analyze_disapproved_products(disapproved_products)
-        issues.extend(issues_from_products)
-        recommendations.extend(recs_from_products)
-        
-        # 2. Check for poor-performing campaigns
-        issues_from_campaigns, recs_from_campaigns = analyze_campaigns(campaign_kpis, account_kpis)
-        issues.extend(issues_from_campaigns)
-        recommendations.extend(recs_from_campaigns)
-        
-        # 3. Check for wasteful search terms
-        issues_from_search_terms, recs_from_search_terms = analyze_search_terms(search_terms)
-        issues.extend(issues_from_search_terms)
-        recommendations.extend(recs_from_search_terms)
-        
-        # 4. Check for policy-limited ads
-        issues_from_policy, recs_from_policy = analyze_policy_issues(policy_issues)
-        issues.extend(issues_from_policy)
-        recommendations.extend(recs_from_policy)
-        
-        # Sort issues by severity
-        severity_order = {"high": 0, "medium": 1, "low": 2}
-        issues.sort(key=lambda x: severity_order.get(x.severity, 3))
-        
-        # Sort recommendations by priority
-        priority_order = {"high": 0, "medium": 1, "low": 2}
-        recommendations.sort(key=lambda x: priority_order.get(x.priority, 3))
-        
-        return SnapshotResponse(
-            summary=summary,
-            top_issues=issues,
-            recommended_actions=recommendations
+
+        return assemble_snapshot(
+            date_range, account_kpis, campaign_kpis, search_terms, policy_issues, disapproved_products
         )
     except Exception as e:
-        # Fallback to demo mode if API calls fail
-        print(f"API Error: {e}. Falling back to demo mode.")
-        return build_demo_snapshot(customer_id, date_range)
+        if is_quota_error(e):
+            cache_put(QUOTA_CIRCUIT_KEY, True, QUOTA_BACKOFF_S)
+            logger.warning(
+                "Google Ads quota exhausted; pausing API calls for %ds", QUOTA_BACKOFF_S, exc_info=True
+            )
+        else:
+            logger.warning("API error while building snapshot", exc_info=True)
+        return build_fallback_snapshot(customer_id, date_range)
 
 
-def build_demo_snapshot(customer_id: str, date_range: str) -> SnapshotResponse:
-    """Generate a demo snapshot with mock data."""
+def is_quota_error(error: Exception) -> bool:
+    """
+    Check whether an API failure is Google Ads quota or rate limiting,
+    as opposed to a transient or request-specific error.
+    """
+    if not isinstance(error, GoogleAdsException):
+        return False
+    return any("quota_error" in e.error_code for e in error.failure.errors)
+
+
+def build_fallback_snapshot(customer_id: str, date_range: str) -> SnapshotResponse:
+    """
+    Build a snapshot without calling the APIs: from the last cached results
+    if they are still within their stale window, otherwise from demo data.
+    """
+    stale_inputs = get_stale_inputs(customer_id, date_range)
+    if stale_inputs is not None:
+        logger.info("Serving cached data for customer %s", customer_id)
+        return assemble_snapshot(date_range, *stale_inputs)
+    logger.info("No cached data for customer %s; falling back to demo mode", customer_id)
+    return build_demo_snapshot(customer_id, date_range)
+
+
+def build_snapshot_sync(customer_id: str, date_range: str = "7d") -> SnapshotResponse:
+    """
+    Blocking wrapper around build_snapshot for callers outside an event loop.
+    """
+    return asyncio.run(build_snapshot(customer_id, date_range))
+
+
+async def build_snapshot_json(customer_id: str, date_range: str = "7d") -> bytes:
+    """
+    Build a snapshot and return it as JSON bytes, ready to send as an
+    application/json response body. Demo snapshots, including the fallback
+    after an API failure, are returned as precomputed bytes.
+    """
+    if not settings.google_ads_developer_token:
+        return build_demo_snapshot_json(date_range)
+    snapshot = await build_snapshot(customer_id, date_range)
+    if snapshot is _demo_snapshot_for(date_range):
+        return build_demo_snapshot_json(date_range)
+    return serialize_snapshot(snapshot)
+
+
+def serialize_snapshot(snapshot: SnapshotResponse) -> bytes:
+    """
+    Encode a snapshot as JSON bytes for the HTTP response.
+    Uses pydantic's compiled serializer directly rather than model_dump()
+    followed by a Python JSON encoder.
+    """
+    return snapshot.model_dump_json().encode("utf-8")
+
+
+def get_stale_inputs(customer_id: str, date_range: str) -> Optional[tuple]:
+    """
+    Look up the last cached API results for a snapshot.
+
+    Returns:
+        Tuple of (account_kpis, campaign_kpis, search_terms, policy_issues,
+        disapproved_products), or None if any of them is missing or expired
+    """
+    inputs = (
+        cached_account_kpis.stale(customer_id, date_range),
+        cached_campaign_kpis.stale(customer_id, date_range),
+        cached_search_terms.stale(customer_id, date_range, min_spend=SEARCH_TERM_MIN_SPEND),
+        cached_policy_issues.stale(customer_id),
+        cached_disapproved_products.stale()
+    )
+    if any(value is None for value in inputs):
+        return None
+    return inputs
+
+
+def assemble_snapshot(
+    date_range: str,
+    account_kpis: dict,
+    campaign_kpis: List[CampaignKPI],
+    search_terms: List[SearchTermData],
+    policy_issues: List[dict],
+    disapproved_products: List[DisapprovedProduct]
+) -> SnapshotResponse:
+    """
+    Build the summary, issues, and recommended actions from fetched API data.
+    """
+    # Build summary
+    summary = Summary(
+        date_range=date_range,
+        total_spend=account_kpis["total_spend"],
+        total_conversions=account_kpis["total_conversions"],
+        average_cpa=account_kpis["average_cpa"],
+        roas=account_kpis["roas"],
+        currency=account_kpis["currency"]
+    )
+    
+    # Identify issues and generate recommendations as lightweight records
+    issues, recommendations = _analyze_all(
+        disapproved_products, campaign_kpis, account_kpis, search_terms, policy_issues
+    )
+    
+    # Sort issues by severity and recommendations by priority
+    issues = sort_by_rank(issues, [_RANK_GET(issue.severity, 3) for issue in issues])
+    recommendations = sort_by_rank(
+        recommendations, [_RANK_GET(rec.priority, 3) for rec in recommendations]
+    )
+    
+    # Analyzer output is built here from already-typed API results, so skip
+    # per-record validation when wrapping it into models
+    return SnapshotResponse(
+        summary=summary,
+        top_issues=[Issue.model_construct(**issue._asdict()) for issue in issues],
+        recommended_actions=[RecommendedAction.model_construct(**rec._asdict()) for rec in recommendations]
+    )
+
+
+def sort_by_rank(items: list, ranks: List[int]) -> list:
+    """
+    Stable counting sort of items by their precomputed rank (0-3).
+    Ranks only take four values, so a single bucketing pass replaces the
+    comparison sort.
+    """
+    buckets = ([], [], [], [])
+    for item, rank in zip(items, ranks):
+        buckets[rank].append(item)
+    return buckets[0] + buckets[1] + buckets[2] + buckets[3]
+
+
+def _build_demo_template() -> SnapshotResponse:
+    """Build the canonical demo snapshot from mock data."""
     
     # Mock Summary
     summary = Summary(
-        date_range=date_range,
+        date_range="7d",
         total_spend=1250.50,
         total_conversions=45.0,
         average_cpa=27.79,
@@ -116,7 +303,7 @@ def build_demo_snapshot(customer_id: str, date_range: str) -> SnapshotResponse:
     
     # Mock Issue 1: Disapproved Product
     issues.append(Issue(
-        type="disapproved_product",
+        type=ISSUE_DISAPPROVED_PRODUCT,
         severity="high",
         description="Product 'Premium Wireless Headphones' (ID: 5521) is disapproved: Invalid GTIN",
         metadata={
@@ -127,15 +314,15 @@ def build_demo_snapshot(customer_id: str, date_range: str) -> SnapshotResponse:
     ))
     
     recommendations.append(RecommendedAction(
-        action_type="fix_product_feed",
+        action_type=ACTION_FIX_PRODUCT_FEED,
         description="Fix product data for 'Premium Wireless Headphones' and request a review in Merchant Center",
         priority="high",
-        related_issue_type="disapproved_product"
+        related_issue_type=ISSUE_DISAPPROVED_PRODUCT
     ))
     
     # Mock Issue 2: Zero Conversion Campaign
     issues.append(Issue(
-        type="zero_conversion_campaign",
+        type=ISSUE_ZERO_CONVERSION_CAMPAIGN,
         severity="high",
         description="Campaign 'Display - Retargeting' spent $150.00 with 0 conversions",
         metadata={
@@ -147,15 +334,15 @@ def build_demo_snapshot(customer_id: str, date_range: str) -> SnapshotResponse:
     ))
     
     recommendations.append(RecommendedAction(
-        action_type="optimize_campaign",
+        action_type=ACTION_OPTIMIZE_CAMPAIGN,
         description="Review and optimize campaign 'Display - Retargeting' or pause it to prevent budget waste",
         priority="high",
-        related_issue_type="zero_conversion_campaign"
+        related_issue_type=ISSUE_ZERO_CONVERSION_CAMPAIGN
     ))
     
     # Mock Issue 3: Wasteful Search Term
     issues.append(Issue(
-        type="wasteful_search_term",
+        type=ISSUE_WASTEFUL_SEARCH_TERM,
         severity="medium",
         description="Search term 'free headphones' spent $45.20 with 0 conversions",
         metadata={
@@ -167,10 +354,10 @@ def build_demo_snapshot(customer_id: str, date_range: str) -> SnapshotResponse:
     ))
     
     recommendations.append(RecommendedAction(
-        action_type="add_negative_keyword",
+        action_type=ACTION_ADD_NEGATIVE_KEYWORD,
         description="Add 'free headphones' as a negative keyword to prevent budget waste",
         priority="medium",
-        related_issue_type="wasteful_search_term"
+        related_issue_type=ISSUE_WASTEFUL_SEARCH_TERM
     ))
     
     return SnapshotResponse(
@@ -180,175 +367,232 @@ def build_demo_snapshot(customer_id: str, date_range: str) -> SnapshotResponse:
     )
 
 
-def analyze_disapproved_products(
-    disapproved_products: List[DisapprovedProduct]
-) -> tuple[List[Issue], List[RecommendedAction]]:
+# The demo data never changes, so validate it once at import
+_DEMO_TEMPLATE = _build_demo_template()
+
+
+def build_demo_snapshot(customer_id: str, date_range: str) -> SnapshotResponse:
     """
-    Analyze disapproved products and generate issues and recommendations.
+    Generate a demo snapshot with mock data.
+    The result is shared between callers and must not be mutated.
     """
-    issues = []
-    recommendations = []
-    
-    for product in disapproved_products[:10]:  # Limit to top 10
-        issue_desc = f"Product '{product.title}' (ID: {product.product_id}) is disapproved"
-        if product.issues:
-            issue_desc += f": {product.issues[0]}"
-        
-        issues.append(Issue(
-            type="disapproved_product",
-            severity="high",
-            description=issue_desc,
-            metadata={
-                "product_id": product.product_id,
-                "product_title": product.title,
-                "issues": product.issues
-            }
-        ))
-        
-        recommendations.append(RecommendedAction(
-            action_type="fix_product_feed",
-            description=f"Fix product data for '{product.title}' and request a review in Merchant Center",
-            priority="high",
-            related_issue_type="disapproved_product"
-        ))
-    
-    return issues, recommendations
+    return _demo_snapshot_for(date_range)
+
+
+@functools.lru_cache(maxsize=8)
+def _demo_snapshot_for(date_range: str) -> SnapshotResponse:
+    """Demo snapshot for a date range; customer_id doesn't affect demo data."""
+    return _DEMO_TEMPLATE.model_copy(update={
+        "summary": _DEMO_TEMPLATE.summary.model_copy(update={"date_range": date_range})
+    })
+
+
+# Demo responses serialize identically for every customer, so encode the
+# common date ranges once at import
+_DEMO_JSON = {
+    date_range: serialize_snapshot(_demo_snapshot_for(date_range))
+    for date_range in ("7d", "30d", "90d")
+}
 
 
-def analyze_campaigns(
+def build_demo_snapshot_json(date_range: str) -> bytes:
+    """Demo snapshot as JSON bytes, precomputed for the common date ranges."""
+    demo_json = _DEMO_JSON.get(date_range)
+    if demo_json is None:
+        demo_json = serialize_snapshot(_demo_snapshot_for(date_range))
+    return demo_json
+
+
+def _analyze_all(
+    disapproved_products: List[DisapprovedProduct],
     campaign_kpis: List[CampaignKPI],
-    account_kpis: dict
-) -> tuple[List[Issue], List[RecommendedAction]]:
+    account_kpis: dict,
+    search_terms: List[SearchTermData],
+    policy_issues: List[dict]
+) -> Tuple[List[IssueRecord], List[ActionRecord]]:
     """
-    Analyze campaign performance and identify issues.
+    Analyze all fetched data in one pass and return (issues, recommendations).
+    Each check is skipped entirely when its input is empty. Metadata dicts
+    are constant-key literals, the cheapest way for CPython to build them.
     """
     issues = []
     recommendations = []
     
-    avg_account_cpa = account_kpis.get("average_cpa")
-    
-    for campaign in campaign_kpis:
-        # Check for campaigns with zero conversions and significant spend
-        if campaign.conversions == 0 and campaign.spend > 50:
-            issues.append(Issue(
-                type="zero_conversion_campaign",
+    # 1. Disapproved products: report the 10 with the most issues
+    if disapproved_products:
+        top_products = heapq.nlargest(10, disapproved_products, key=lambda p: len(p.issues or ()))
+        
+        for product in top_products:
+            if product.issues:
+                issue_desc = PRODUCT_ISSUE_DESC % (product.title, product.product_id, product.issues[0])
+            else:
+                issue_desc = PRODUCT_DESC % (product.title, product.product_id)
+            
+            issues.append(IssueRecord(
+                type=ISSUE_DISAPPROVED_PRODUCT,
                 severity="high",
-                description=f"Campaign '{campaign.campaign_name}' spent ${campaign.spend:.2f} with 0 conversions",
+                description=issue_desc,
                 metadata={
-                    "campaign_id": campaign.campaign_id,
-                    "campaign_name": campaign.campaign_name,
-                    "spend": campaign.spend,
-                    "conversions": campaign.conversions
+                    "product_id": product.product_id,
+                    "product_title": product.title,
+                    "issues": list(product.issues) if product.issues is not None else None
                 }
             ))
             
-            recommendations.append(RecommendedAction(
-                action_type="optimize_campaign",
-                description=f"Review and optimize campaign '{campaign.campaign_name}' or pause it to prevent budget waste",
+            recommendations.append(ActionRecord(
+                action_type=ACTION_FIX_PRODUCT_FEED,
+                description=PRODUCT_REC_DESC % product.title,
                 priority="high",
-                related_issue_type="zero_conversion_campaign"
+                related_issue_type=ISSUE_DISAPPROVED_PRODUCT
             ))
+    
+    # 2. Poor-performing campaigns
+    if campaign_kpis:
+        avg_account_cpa = account_kpis.get("average_cpa")
         
-        # Check for campaigns with high CPA
-        elif campaign.cpa and avg_account_cpa and campaign.cpa > avg_account_cpa * 2:
-            issues.append(Issue(
-                type="high_cpa_campaign",
+        for campaign, zero_conversion in flag_campaigns(campaign_kpis, avg_account_cpa):
+            # Campaigns with zero conversions and significant spend
+            if zero_conversion:
+                issues.append(IssueRecord(
+                    type=ISSUE_ZERO_CONVERSION_CAMPAIGN,
+                    severity="high",
+                    description=ZERO_CONV_DESC % (campaign.campaign_name, campaign.spend),
+                    metadata={
+                        "campaign_id": campaign.campaign_id,
+                        "campaign_name": campaign.campaign_name,
+                        "spend": campaign.spend,
+                        "conversions": campaign.conversions
+                    }
+                ))
+                
+                recommendations.append(ActionRecord(
+                    action_type=ACTION_OPTIMIZE_CAMPAIGN,
+                    description=ZERO_CONV_REC_DESC % campaign.campaign_name,
+                    priority="high",
+                    related_issue_type=ISSUE_ZERO_CONVERSION_CAMPAIGN
+                ))
+            
+            # Campaigns with high CPA
+            else:
+                issues.append(IssueRecord(
+                    type=ISSUE_HIGH_CPA_CAMPAIGN,
+                    severity="medium",
+                    description=HIGH_CPA_DESC % (campaign.campaign_name, campaign.cpa),
+                    metadata={
+                        "campaign_id": campaign.campaign_id,
+                        "campaign_name": campaign.campaign_name,
+                        "cpa": campaign.cpa,
+                        "account_avg_cpa": avg_account_cpa
+                    }
+                ))
+                
+                recommendations.append(ActionRecord(
+                    action_type=ACTION_OPTIMIZE_CAMPAIGN,
+                    description=HIGH_CPA_REC_DESC % campaign.campaign_name,
+                    priority="medium",
+                    related_issue_type=ISSUE_HIGH_CPA_CAMPAIGN
+                ))
+    
+    # 3. Wasteful search terms
+    if search_terms:
+        # Report up to 15 flagged terms: wasteful ones first, then by cost
+        top_terms = heapq.nlargest(
+            15, flag_search_terms(search_terms), key=lambda hit: (hit[1], hit[0].cost)
+        )
+        
+        for term, wasteful in top_terms:
+            # High-cost, zero-conversion search terms
+            if wasteful:
+                issues.append(IssueRecord(
+                    type=ISSUE_WASTEFUL_SEARCH_TERM,
+                    severity="medium",
+                    description=WASTEFUL_TERM_DESC % (term.search_term, term.cost),
+                    metadata={
+                        "search_term": term.search_term,
+                        "cost": term.cost,
+                        "clicks": term.clicks,
+                        "conversions": term.conversions
+                    }
+                ))
+                
+                recommendations.append(ActionRecord(
+                    action_type=ACTION_ADD_NEGATIVE_KEYWORD,
+                    description=WASTEFUL_TERM_REC_DESC % term.search_term,
+                    priority="medium",
+                    related_issue_type=ISSUE_WASTEFUL_SEARCH_TERM
+                ))
+            
+            # Low conversion rate with significant spend
+            else:
+                issues.append(IssueRecord(
+                    type=ISSUE_LOW_CONVERSION_SEARCH_TERM,
+                    severity="low",
+                    description=LOW_CONV_TERM_DESC % (term.search_term, term.conversion_rate, term.cost),
+                    metadata={
+                        "search_term": term.search_term,
+                        "cost": term.cost,
+                        "conversion_rate": term.conversion_rate
+                    }
+                ))
+                
+                recommendations.append(ActionRecord(
+                    action_type=ACTION_REVIEW_SEARCH_TERM,
+                    description=LOW_CONV_TERM_REC_DESC % term.search_term,
+                    priority="low",
+                    related_issue_type=ISSUE_LOW_CONVERSION_SEARCH_TERM
+                ))
+    
+    # 4. Policy-limited ads
+    if policy_issues:
+        for policy_issue in islice(policy_issues, 10):  # Limit to top 10
+            issues.append(IssueRecord(
+                type=ISSUE_POLICY_LIMITED_AD,
                 severity="medium",
-                description=f"Campaign '{campaign.campaign_name}' has CPA of ${campaign.cpa:.2f}, 2x higher than account average",
-                metadata={
-                    "campaign_id": campaign.campaign_id,
-                    "campaign_name": campaign.campaign_name,
-                    "cpa": campaign.cpa,
-                    "account_avg_cpa": avg_account_cpa
-                }
+                description=POLICY_DESC % policy_issue,
+                metadata=dict(policy_issue)
             ))
             
-            recommendations.append(RecommendedAction(
-                action_type="optimize_campaign",
-                description=f"Optimize targeting or ad copy for campaign '{campaign.campaign_name}' to reduce CPA",
+            recommendations.append(ActionRecord(
+                action_type=ACTION_FIX_POLICY_ISSUE,
+                description=POLICY_REC_DESC % policy_issue,
                 priority="medium",
-                related_issue_type="high_cpa_campaign"
+                related_issue_type=ISSUE_POLICY_LIMITED_AD
             ))
     
     return issues, recommendations
 
 
-def analyze_search_terms(
-    search_terms: List[SearchTermData]
-) -> tuple[List[Issue], List[RecommendedAction]]:
+def flag_campaigns(
+    campaign_kpis: List[CampaignKPI],
+    avg_account_cpa: Optional[float]
+) -> Iterator[Tuple[CampaignKPI, bool]]:
     """
-    Analyze search terms and identify wasteful queries.
+    Yield the campaigns worth reporting, in input order.
+
+    Yields:
+        (campaign, zero_conversion) where zero_conversion is True for campaigns
+        with significant spend and no conversions, and False for campaigns
+        with a CPA more than twice the account average
     """
-    issues = []
-    recommendations = []
-    
-    for term in search_terms[:15]:  # Limit to top 15
-        # Check for high-cost, zero-conversion search terms
-        if term.conversions == 0 and term.cost > 20:
-            issues.append(Issue(
-                type="wasteful_search_term",
-                severity="medium",
-                description=f"Search term '{term.search_term}' spent ${term.cost:.2f} with 0 conversions",
-                metadata={
-                    "search_term": term.search_term,
-                    "cost": term.cost,
-                    "clicks": term.clicks,
-                    "conversions": term.conversions
-                }
-            ))
-            
-            recommendations.append(RecommendedAction(
-                action_type="add_negative_keyword",
-                description=f"Add '{term.search_term}' as a negative keyword to prevent budget waste",
-                priority="medium",
-                related_issue_type="wasteful_search_term"
-            ))
-        
-        # Check for low conversion rate with significant spend
-        elif term.conversion_rate and term.conversion_rate < 1.0 and term.cost > 50:
-            issues.append(Issue(
-                type="low_conversion_search_term",
-                severity="low",
-                description=f"Search term '{term.search_term}' has low conversion rate ({term.conversion_rate:.2f}%) with ${term.cost:.2f} spend",
-                metadata={
-                    "search_term": term.search_term,
-                    "cost": term.cost,
-                    "conversion_rate": term.conversion_rate
-                }
-            ))
-            
-            recommendations.append(RecommendedAction(
-                action_type="review_search_term",
-                description=f"Review search term '{term.search_term}' and consider adding as negative or adjusting match type",
-                priority="low",
-                related_issue_type="low_conversion_search_term"
-            ))
-    
-    return issues, recommendations
+    for campaign in campaign_kpis:
+        if campaign.conversions == 0 and campaign.spend > 50:
+            yield campaign, True
+        elif campaign.cpa and avg_account_cpa and campaign.cpa > avg_account_cpa * 2:
+            yield campaign, False
 
 
-def analyze_policy_issues(
-    policy_issues: List[dict]
-) -> tuple[List[Issue], List[RecommendedAction]]:
+def flag_search_terms(
+    search_terms: List[SearchTermData]
+) -> Iterator[Tuple[SearchTermData, bool]]:
     """
-    Analyze policy-limited or disapproved ads.
+    Yield the search terms worth reporting, in input order.
+
+    Yields:
+        (term, wasteful) where wasteful is True for high-cost, zero-conversion
+        terms and False for low-conversion-rate terms with significant spend
     """
-    issues = []
-    recommendations = []
-    
-    for policy_issue in policy_issues[:10]:  # Limit to top 10
-        issues.append(Issue(
-            type="policy_limited_ad",
-            severity="medium",
-            description=f"Ad '{policy_issue['ad_name']}' in campaign '{policy_issue['campaign_name']}' has approval status: {policy_issue['approval_status']}",
-            metadata=policy_issue
-        ))
-        
-        recommendations.append(RecommendedAction(
-            action_type="fix_policy_issue",
-            description=f"Review and modify ad '{policy_issue['ad_name']}' to comply with Google Ads policies",
-            priority="medium",
-            related_issue_type="policy_limited_ad"
-        ))
-    
-    return issues, recommendations
+    for term in search_terms:
+        if term.conversions == 0 and term.cost > 20:
+            yield term, True
+        elif term.conversion_rate and term.conversion_rate < 1.0 and term.cost > 50:
+            yield term, False